@@ -95,16 +95,20 @@ def get_home(ensure_exists: bool = True) -> Path:
     return getenv_path(CONFIG_HOME_ENVVAR, default, ensure_exists=ensure_exists)
 
 
-@lru_cache(maxsize=1)
 def _get_cfp(module: str) -> ConfigParser:
-    cfp = ConfigParser()
-    directory = get_home()
-
     # If a multi-part module was given like "zenodo:sandbox",
     # then only look for the first part "zenodo" as the file name
     if ":" in module:
         module = module.split(":", 1)[0]
+    # The environment variables that determine the configuration home are part
+    # of the cache key, so changing them doesn't return stale configuration
+    return _read_cfp(module, os.getenv(CONFIG_HOME_ENVVAR), os.getenv(CONFIG_NAME_ENVVAR))
+
 
+@lru_cache(maxsize=128)
+def _read_cfp(module: str, home: str | None, name: str | None) -> ConfigParser:
+    # home and name are only used as part of the cache key, since get_home() reads them itself
+    directory = get_home()
     filenames = [
         os.path.join(directory, "config.cfg"),
         os.path.join(directory, "config.ini"),
@@ -119,6 +123,7 @@ def _get_cfp(module: str) -> ConfigParser:
         os.path.join(directory, module, "conf.cfg"),
         os.path.join(directory, module, "config.cfg"),
     ]
+    cfp = ConfigParser()
     cfp.read(filenames)
     return cfp
 
@@ -145,6 +150,8 @@ def get_config(
         is given
     :returns: The config value or the default.
     :raises ConfigError: If ``raise_on_missing`` conditions are met
+    :raises TypeError: If ``dtype`` is given but is not one of :func:`int`, :func:`float`,
+        :func:`bool`, or :func:`str`, including when the value comes from ``passthrough``
     """
     if passthrough is not None:
         return _cast(passthrough, dtype)
@@ -160,20 +167,44 @@ def get_config(
 
 
 def _cast(rv: Any, dtype: None | Callable[..., Any]) -> Any:
-    if not isinstance(rv, str):  # if it's not a string, it doesn't need munging
+    if dtype is None or type(rv) is dtype:  # already the right type
         return rv
-    if dtype in (None, str):  # no munging necessary
+    try:
+        caster = _CASTERS[dtype]
+    except KeyError:
+        raise TypeError(f"dtype is invalid: {dtype}") from None
+    if dtype is not bool and not isinstance(rv, str):
+        # if it's not a string, it doesn't need munging
         return rv
-    if dtype in (int, float):
-        return dtype(rv)
-    if dtype is bool:
-        if rv.lower() in ("t", "true", "yes", "1", 1, True):
-            return True
-        elif rv.lower() in ("f", "false", "no", "0", 0, False):
-            return False
-        else:
-            raise ValueError(f"value can not be coerced into bool: {rv}")
-    raise TypeError(f"dtype is invalid: {dtype}")
+    return caster(rv)
+
+
+#: Case-insensitive string values that are interpreted as true
+_TRUE_STRINGS = frozenset(["t", "true", "yes", "1"])
+#: Case-insensitive string values that are interpreted as false
+_FALSE_STRINGS = frozenset(["f", "false", "no", "0"])
+
+
+def _cast_bool(rv: Any) -> Any:
+    if isinstance(rv, int):
+        return bool(rv)
+    if not isinstance(rv, str):
+        return rv
+    folded = rv.casefold()
+    if folded in _TRUE_STRINGS:
+        return True
+    if folded in _FALSE_STRINGS:
+        return False
+    raise ValueError(f"value can not be coerced into bool: {rv}")
+
+
+#: Functions for casting a configuration value into each of the valid dtypes
+_CASTERS: dict[Any, Callable[[Any], Any]] = {
+    str: str,
+    int: int,
+    float: float,
+    bool: _cast_bool,
+}
 
 
 def write_config(module: str, key: str, value: str) -> None:
@@ -183,7 +214,7 @@ def write_config(module: str, key: str, value: str) -> None:
     :param key: The key of the configuration in the app
     :param value: The value of the configuration in the app
     """
-    _get_cfp.cache_clear()
+    _read_cfp.cache_clear()
     cfp = ConfigParser()
 
     # If there's a multi-part module such as "zenodo:sandbox",
@@ -27,7 +27,7 @@ from typing import (
     cast,
 )
 from urllib.parse import urlparse
-from urllib.request import urlretrieve
+from urllib.request import url2pathname, urlretrieve
 from uuid import uuid4
 
 import requests
@@ -341,13 +341,15 @@ def download(
     :param hexdigests_strict:
         Set this to false to stop automatically checking for the `algorithm(filename)=hash` format
     :param progress_bar:
-        Set to true to show a progress bar while downloading
+        Set to true to show a progress bar while downloading. No progress bar is shown
+        when the 'urllib' backend copies a local ``file://`` URL.
     :param tqdm_kwargs:
         Override the default arguments passed to :class:`tadm.tqdm` when progress_bar is True.
     :param kwargs:
         The keyword arguments to pass to :func:`urllib.request.urlretrieve`
         or to `requests.get` depending on the backend chosen. If using 'requests' backend,
-        `stream` is set to True by default.
+        `stream` is set to True by default. These are ignored when the 'urllib' backend
+        copies a local ``file://`` URL.
 
     :raises Exception: Thrown if an error besides a keyboard interrupt is thrown during download
     :raises KeyboardInterrupt: If a keyboard interrupt is thrown during download
@@ -383,12 +385,7 @@ def download(
 
     try:
         if backend == "urllib":
-            logger.info("downloading with urllib from %s to %s", url, path)
-            with TqdmReportHook(**_tqdm_kwargs) as t:
-                try:
-                    urlretrieve(url, path, reporthook=t.update_to, **kwargs)  # noqa:S310
-                except urllib.error.URLError as e:
-                    raise DownloadError(backend, url, path, e) from e
+            _download_urllib(url, path, tqdm_kwargs=_tqdm_kwargs, **kwargs)
         elif backend == "requests":
             kwargs.setdefault("stream", True)
             try:
@@ -428,6 +425,26 @@ def download(
     )
 
 
+def _download_urllib(url: str, path: Path, tqdm_kwargs: Mapping[str, Any], **kwargs: Any) -> None:
+    parsed = urlparse(url)
+    if parsed.scheme == "file" and parsed.netloc in {"", "localhost"}:
+        logger.info("copying local file from %s to %s", url, path)
+        # shutil.copyfile uses in-kernel copying where the platform supports it,
+        # so local files don't need to pass through urlretrieve's read/write loop
+        try:
+            shutil.copyfile(url2pathname(parsed.path), path)
+        except OSError as e:
+            raise DownloadError("urllib", url, path, urllib.error.URLError(e)) from e
+        return
+
+    logger.info("downloading with urllib from %s to %s", url, path)
+    with TqdmReportHook(**tqdm_kwargs) as t:
+        try:
+            urlretrieve(url, path, reporthook=t.update_to, **kwargs)  # noqa:S310
+        except urllib.error.URLError as e:
+            raise DownloadError("urllib", url, path, e) from e
+
+
 class DownloadError(OSError):
     """An error that wraps information from a requests or urllib download failure."""
 
@@ -511,11 +528,13 @@ def mock_envvar(envvar: str, value: str) -> Iterator[None]:
     """
     original_value = os.environ.get(envvar)
     os.environ[envvar] = value
-    yield
-    if original_value is None:
-        del os.environ[envvar]
-    else:
-        os.environ[envvar] = original_value
+    try:
+        yield
+    finally:
+        if original_value is None:
+            os.environ.pop(envvar, None)
+        else:
+            os.environ[envvar] = original_value
 
 
 @contextlib.contextmanager
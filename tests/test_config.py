@@ -2,14 +2,17 @@
 
 from __future__ import annotations
 
+import os
 import tempfile
 import unittest
-from pathlib import Path
 
 import pystow
 from pystow.config_api import CONFIG_HOME_ENVVAR, _get_cfp
 from pystow.utils import mock_envvar
 
+#: Values that should be interpreted as true when getting a config with ``dtype=bool``
+TRUE_VALUES = ("1", "yes", "Yes", "YES", "True", "TRUE", "T", "t", True, 1)
+
 
 class TestConfig(unittest.TestCase):
     """Test configuration."""
@@ -31,13 +34,12 @@ class TestConfig(unittest.TestCase):
     def test_env_cast(self):
         """Test casting works properly when getting from the environment."""
         with mock_envvar("TEST_VAR", "1234"):
-            self.assertEqual("1234", pystow.get_config("test", "var"))
-            self.assertEqual("1234", pystow.get_config("test", "var", dtype=str))
-            self.assertEqual(1234, pystow.get_config("test", "var", dtype=int))
-            with self.assertRaises(ValueError):
-                pystow.get_config("test", "var", dtype=bool)
-            with self.assertRaises(TypeError):
-                pystow.get_config("test", "var", dtype=object)
+            for dtype, expected in [(None, "1234"), (str, "1234"), (int, 1234)]:
+                with self.subTest(dtype=dtype):
+                    self.assertEqual(expected, pystow.get_config("test", "var", dtype=dtype))
+            for dtype, exception in [(bool, ValueError), (object, TypeError)]:
+                with self.subTest(dtype=dtype), self.assertRaises(exception):
+                    pystow.get_config("test", "var", dtype=dtype)
 
     def test_get_config(self):
         """Test lookup not existing."""
@@ -54,57 +56,27 @@ class TestConfig(unittest.TestCase):
             1, pystow.get_config(self.test_section, self.test_option, passthrough="1", dtype=int)
         )
 
-        self.assertEqual(
-            True,
-            pystow.get_config(self.test_section, self.test_option, passthrough="1", dtype=bool),
-        )
-        self.assertEqual(
-            True,
-            pystow.get_config(self.test_section, self.test_option, passthrough="yes", dtype=bool),
-        )
-        self.assertEqual(
-            True,
-            pystow.get_config(self.test_section, self.test_option, passthrough="Yes", dtype=bool),
-        )
-        self.assertEqual(
-            True,
-            pystow.get_config(self.test_section, self.test_option, passthrough="YES", dtype=bool),
-        )
-        self.assertEqual(
-            True,
-            pystow.get_config(self.test_section, self.test_option, passthrough="True", dtype=bool),
-        )
-        self.assertEqual(
-            True,
-            pystow.get_config(self.test_section, self.test_option, passthrough="TRUE", dtype=bool),
-        )
-        self.assertEqual(
-            True,
-            pystow.get_config(self.test_section, self.test_option, passthrough="T", dtype=bool),
-        )
-        self.assertEqual(
-            True,
-            pystow.get_config(self.test_section, self.test_option, passthrough="t", dtype=bool),
-        )
-        self.assertEqual(
-            True,
-            pystow.get_config(self.test_section, self.test_option, passthrough=True, dtype=bool),
-        )
-        self.assertEqual(
-            True, pystow.get_config(self.test_section, self.test_option, passthrough=1, dtype=bool)
-        )
+        for value in TRUE_VALUES:
+            with self.subTest(value=value):
+                self.assertIs(
+                    True,
+                    pystow.get_config(
+                        self.test_section, self.test_option, passthrough=value, dtype=bool
+                    ),
+                )
 
     def test_subsection(self):
         """Test subsections."""
         with tempfile.TemporaryDirectory() as directory, mock_envvar(CONFIG_HOME_ENVVAR, directory):
-            directory = Path(directory)
-            path = directory.joinpath("test.ini")
-            self.assertFalse(path.is_file(), msg="file should not already exist")
+            name = "test.ini"
+            self.assertNotIn(name, os.listdir(directory), msg="file should not already exist")
 
             self.assertIsNone(pystow.get_config("test:subtest", "key"))
-            self.assertFalse(path.is_file(), msg="getting config should not create a file")
+            self.assertNotIn(
+                name, os.listdir(directory), msg="getting config should not create a file"
+            )
 
             pystow.write_config("test:subtest", "key", "value")
-            self.assertTrue(path.is_file(), msg=f"{list(directory.iterdir())}")
+            self.assertIn(name, os.listdir(directory))
 
             self.assertEqual("value", pystow.get_config("test:subtest", "key"))
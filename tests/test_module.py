@@ -9,15 +9,14 @@ import json
 import lzma
 import os
 import pickle
-import shutil
+import random
 import tempfile
 import unittest
-from collections.abc import Mapping
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING
 from unittest import mock
 
-import pandas as pd
-
 import pystow
 from pystow import join
 from pystow.constants import PYSTOW_HOME_ENVVAR, PYSTOW_NAME_ENVVAR
@@ -26,70 +25,91 @@ from pystow.utils import (
     get_home,
     get_name,
     mock_envvar,
-    n,
     write_pickle_gz,
     write_sql,
     write_tarfile_csv,
     write_zipfile_csv,
 )
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 HERE = Path(__file__).parent.resolve()
 RESOURCES = HERE.joinpath("resources")
 
+#: The generator for the names used in these tests. Set the ``PYSTOW_TEST_SEED``
+#: environment variable to make the names the same on each run.
+_RNG = random.Random(os.getenv("PYSTOW_TEST_SEED"))  # noqa:S311
+
+
+def n() -> str:
+    """Get a random name for testing.
+
+    This is a cheaper alternative to :func:`pystow.utils.n`, which generates a new UUID
+    on each call.
+
+    :returns: A random name for testing purposes.
+    """
+    return f"t{_RNG.getrandbits(64):016x}"
+
+
 TSV_NAME = "test_1.tsv"
-TSV_URL = f"{n()}/{TSV_NAME}"
+TSV_URL = RESOURCES.joinpath(TSV_NAME).as_uri()
 
 SQLITE_NAME = "test_1.db"
-SQLITE_URL = f"{n()}/{SQLITE_NAME}"
 SQLITE_PATH = RESOURCES / SQLITE_NAME
+SQLITE_URL = SQLITE_PATH.as_uri()
 SQLITE_TABLE = "testtable"
 
 JSON_NAME = "test_1.json"
-JSON_URL = f"{n()}/{JSON_NAME}"
 JSON_PATH = RESOURCES / JSON_NAME
+JSON_URL = JSON_PATH.as_uri()
 
 PICKLE_NAME = "test_1.pkl"
-PICKLE_URL = f"{n()}/{PICKLE_NAME}"
 PICKLE_PATH = RESOURCES / PICKLE_NAME
+PICKLE_URL = PICKLE_PATH.as_uri()
 
 PICKLE_GZ_NAME = "test_1.pkl.gz"
-PICKLE_GZ_URL = f"{n()}/{PICKLE_GZ_NAME}"
 PICKLE_GZ_PATH = RESOURCES / PICKLE_GZ_NAME
+PICKLE_GZ_URL = PICKLE_GZ_PATH.as_uri()
 
 JSON_BZ2_NAME = "test_1.json.bz2"
-JSON_BZ2_URL = f"{n()}/{JSON_BZ2_NAME}"
 JSON_BZ2_PATH = RESOURCES / JSON_BZ2_NAME
-
-MOCK_FILES: Mapping[str, Path] = {
-    TSV_URL: RESOURCES / TSV_NAME,
-    JSON_URL: JSON_PATH,
-    JSON_BZ2_URL: JSON_BZ2_PATH,
-    PICKLE_URL: PICKLE_PATH,
-    PICKLE_GZ_URL: PICKLE_GZ_PATH,
-    SQLITE_URL: SQLITE_PATH,
-}
+JSON_BZ2_URL = JSON_BZ2_PATH.as_uri()
 
 TEST_TSV_ROWS = [
     ("h1", "h2", "h3"),
     ("v1_1", "v1_2", "v1_3"),
     ("v2_1", "v2_2", "v2_3"),
 ]
-TEST_DF = pd.DataFrame(TEST_TSV_ROWS)
 TEST_JSON = {"key": "value"}
 
-# Make the pickle file
-if not PICKLE_PATH.is_file():
-    PICKLE_PATH.write_bytes(pickle.dumps(TEST_TSV_ROWS))
 
-if not SQLITE_PATH.is_file():
-    write_sql(TEST_DF, name=SQLITE_TABLE, path=SQLITE_PATH, index=False)
+@lru_cache(maxsize=1)
+def _get_test_df() -> pd.DataFrame:
+    """Build the test dataframe on first use, since most tests don't need it."""
+    import pandas as pd
 
-if not JSON_PATH.is_file():
-    JSON_PATH.write_text(json.dumps(TEST_JSON))
+    return pd.DataFrame(TEST_TSV_ROWS)
 
-if not JSON_BZ2_PATH.is_file():
-    with bz2.open(JSON_BZ2_PATH, mode="wt") as file:
-        json.dump(TEST_JSON, file, indent=2)
+
+def setUpModule() -> None:
+    """Make the resource files that are missing, once before any test in this module runs."""
+    if not PICKLE_PATH.is_file():
+        PICKLE_PATH.write_bytes(pickle.dumps(TEST_TSV_ROWS))
+
+    if not PICKLE_GZ_PATH.is_file():
+        write_pickle_gz(TEST_TSV_ROWS, path=PICKLE_GZ_PATH)
+
+    if not SQLITE_PATH.is_file():
+        write_sql(_get_test_df(), name=SQLITE_TABLE, path=SQLITE_PATH, index=False)
+
+    if not JSON_PATH.is_file():
+        JSON_PATH.write_text(json.dumps(TEST_JSON))
+
+    if not JSON_BZ2_PATH.is_file():
+        with bz2.open(JSON_BZ2_PATH, mode="wt") as file:
+            json.dump(TEST_JSON, file, indent=2)
 
 
 class TestMocks(unittest.TestCase):
@@ -126,13 +146,20 @@ class TestMocks(unittest.TestCase):
 class TestJoin(unittest.TestCase):
     """Tests for :mod:`pystow`."""
 
-    def setUp(self) -> None:
-        """Set up the test case."""
-        self.directory = tempfile.TemporaryDirectory()
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Set up a temporary directory shared by all tests in the test case."""
+        cls.tmpdir = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        """Tear down the shared temporary directory."""
+        cls.tmpdir.cleanup()
 
-    def tearDown(self) -> None:
-        """Tear down the test case."""
-        self.directory.cleanup()
+    def setUp(self) -> None:
+        """Set up the test with its own subdirectory of the shared temporary directory."""
+        self.directory = Path(self.tmpdir.name).joinpath(self._testMethodName)
+        self.directory.mkdir()
 
     @contextlib.contextmanager
     def mock_directory(self) -> contextlib.AbstractContextManager[Path]:
@@ -140,33 +167,8 @@ class TestJoin(unittest.TestCase):
 
         :yield: The mock directory's path
         """
-        with mock_envvar(PYSTOW_HOME_ENVVAR, self.directory.name):
-            yield Path(self.directory.name)
-
-    @staticmethod
-    def mock_download():
-        """Mock connection to the internet using local resource files.
-
-        :return: A patch object that can be applied to the pystow download function
-        """
-
-        def _mock_get_data(url: str, path: str | Path, **_kwargs) -> Path:
-            return shutil.copy(MOCK_FILES[url], path)
-
-        return mock.patch("pystow.utils.download", side_effect=_mock_get_data)
-
-    @staticmethod
-    def mock_download_once(local_path: str | Path):
-        """Mock connection to the internet using local resource files.
-
-        :param local_path: the path to the file to mock
-        :return: A patch object that can be applied to the pystow download function
-        """
-
-        def _mock_get_data(path: str | Path, **_kwargs) -> Path:
-            return shutil.copy(local_path, path)
-
-        return mock.patch("pystow.utils.download", side_effect=_mock_get_data)
+        with mock_envvar(PYSTOW_HOME_ENVVAR, self.directory.as_posix()):
+            yield self.directory
 
     def join(self, *parts: str) -> Path:
         """Help join the parts to this test case's temporary directory.
@@ -174,12 +176,12 @@ class TestJoin(unittest.TestCase):
         :param parts: The file path parts that are joined with this test case's directory
         :return: A path to the file
         """
-        return Path(self.directory.name).joinpath(*parts)
+        return self.directory.joinpath(*parts)
 
     def test_mock(self):
         """Test that mocking the directory works properly for this test case."""
         with self.mock_directory():
-            self.assertEqual(os.getenv(PYSTOW_HOME_ENVVAR), self.directory.name)
+            self.assertEqual(os.getenv(PYSTOW_HOME_ENVVAR), self.directory.as_posix())
 
     def test_join(self):
         """Test the :func:`pystow.join` function."""
@@ -230,15 +232,15 @@ class TestJoin(unittest.TestCase):
 
     def test_ensure(self):
         """Test ensuring various files."""
-        write_pickle_gz(TEST_TSV_ROWS, path=PICKLE_GZ_PATH)
+        import pandas as pd
 
-        with self.mock_directory(), self.mock_download():
+        with self.mock_directory():
             with self.subTest(type="tsv"):
                 df = pystow.ensure_csv("test", url=TSV_URL)
                 self.assertEqual(3, len(df.columns))
 
                 df2 = pystow.load_df("test", name=TSV_NAME)
-                self.assertEqual(df.values.tolist(), df2.values.tolist())
+                pd.testing.assert_frame_equal(df, df2)
 
             with self.subTest(type="json"):
                 j = pystow.ensure_json("test", url=JSON_URL)
@@ -276,37 +278,42 @@ class TestJoin(unittest.TestCase):
 
     def test_ensure_open_lzma(self):
         """Test opening lzma-encoded files."""
+        import pandas as pd
+
         with tempfile.TemporaryDirectory() as directory, self.mock_directory():
             path = Path(directory) / n()
-            with self.mock_download_once(path):
-                with lzma.open(path, "wt") as file:
-                    for row in TEST_TSV_ROWS:
-                        print(*row, sep="\t", file=file)
-                with pystow.ensure_open_lzma("test", url=n()) as file:
-                    df = pd.read_csv(file, sep="\t")
-                    self.assertEqual(3, len(df.columns))
+            with lzma.open(path, "wt", preset=0) as file:
+                for row in TEST_TSV_ROWS:
+                    print(*row, sep="\t", file=file)
+            with pystow.ensure_open_lzma("test", url=path.as_uri()) as file:
+                df = pd.read_csv(file, sep="\t", dtype=str)
+                self.assertEqual(3, len(df.columns))
 
     def test_ensure_open_zip(self):
         """Test opening tar-encoded files."""
+        import pandas as pd
+
         with tempfile.TemporaryDirectory() as directory, self.mock_directory():
             path = Path(directory) / n()
             inner_path = n()
-            with self.mock_download_once(path):
-                write_zipfile_csv(TEST_DF, path, inner_path)
-                with pystow.ensure_open_zip("test", url=n(), inner_path=inner_path) as file:
-                    df = pd.read_csv(file, sep="\t")
-                    self.assertEqual(3, len(df.columns))
+            write_zipfile_csv(_get_test_df(), path, inner_path)
+            with pystow.ensure_open_zip("test", url=path.as_uri(), inner_path=inner_path) as file:
+                df = pd.read_csv(file, sep="\t", dtype=str)
+                self.assertEqual(3, len(df.columns))
 
     def test_ensure_open_tarfile(self):
         """Test opening tarfile-encoded files."""
+        import pandas as pd
+
         with tempfile.TemporaryDirectory() as directory, self.mock_directory():
             path = Path(directory) / n()
             inner_path = n()
-            with self.mock_download_once(path):
-                write_tarfile_csv(TEST_DF, path, inner_path)
-                with pystow.ensure_open_tarfile("test", url=n(), inner_path=inner_path) as file:
-                    df = pd.read_csv(file, sep="\t")
-                    self.assertEqual(3, len(df.columns))
+            write_tarfile_csv(_get_test_df(), path, inner_path)
+            with pystow.ensure_open_tarfile(
+                "test", url=path.as_uri(), inner_path=inner_path
+            ) as file:
+                df = pd.read_csv(file, sep="\t", dtype=str)
+                self.assertEqual(3, len(df.columns))
 
     def test_ensure_module(self):
         """Test that the ``ensure_exist`` argument in :meth:`Module.from_key` works properly."""
@@ -362,7 +369,9 @@ class TestJoin(unittest.TestCase):
 
     def test_ensure_open_sqlite(self):
         """Test caching SQLite."""
-        with self.mock_directory(), self.mock_download():
+        import pandas as pd
+
+        with self.mock_directory():
             with pystow.ensure_open_sqlite("test", url=SQLITE_URL) as conn:
                 df = pd.read_sql(f"SELECT * from {SQLITE_TABLE}", conn)  # noqa:S608
                 self.assertEqual(3, len(df.columns))
@@ -2,14 +2,20 @@
 
 from __future__ import annotations
 
+import contextlib
 import hashlib
 import os
+import socket
+import sys
 import tempfile
+import threading
 import unittest
+from functools import lru_cache
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from unittest import mock
 
-import numpy as np
-import pandas as pd
 import requests
 from lxml import etree
 from requests_file import FileAdapter
@@ -17,6 +23,7 @@ from requests_file import FileAdapter
 from pystow.utils import (
     DownloadError,
     HexDigestError,
+    TqdmReportHook,
     download,
     get_hexdigests_remote,
     getenv_path,
@@ -34,11 +41,41 @@ from pystow.utils import (
     write_zipfile_xml,
 )
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 HERE = Path(__file__).resolve().parent
-TEST_TXT = HERE.joinpath("resources", "test.txt")
-TEST_TXT_MD5 = HERE.joinpath("resources", "test.txt.md5")
-TEST_TXT_VERBOSE_MD5 = HERE.joinpath("resources", "test_verbose.txt.md5")
-TEST_TXT_WRONG_MD5 = HERE.joinpath("resources", "test_wrong.txt.md5")
+RESOURCES = HERE.joinpath("resources")
+TEST_TXT = RESOURCES.joinpath("test.txt")
+TEST_TXT_MD5 = RESOURCES.joinpath("test.txt.md5")
+TEST_TXT_VERBOSE_MD5 = RESOURCES.joinpath("test_verbose.txt.md5")
+TEST_TXT_WRONG_MD5 = RESOURCES.joinpath("test_wrong.txt.md5")
+
+TEST_TXT_URI = TEST_TXT.as_uri()
+TEST_TXT_MD5_URI = TEST_TXT_MD5.as_uri()
+TEST_TXT_VERBOSE_MD5_URI = TEST_TXT_VERBOSE_MD5.as_uri()
+TEST_TXT_WRONG_MD5_URI = TEST_TXT_WRONG_MD5.as_uri()
+
+
+def _get_md5_hexdigest(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Calculate the MD5 hexdigest of a file without reading it all into memory at once.
+
+    Uses :func:`hashlib.file_digest` on Python 3.11+, otherwise reads ``chunk_size`` bytes
+    at a time.
+    """
+    with path.open("rb", buffering=0) as file:
+        if sys.version_info >= (3, 11):
+            return hashlib.file_digest(file, "md5").hexdigest()
+        md5 = hashlib.md5()  # noqa: S324
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+#: The MD5 hexdigest of the test file, calculated independently of :mod:`pystow`
+EXPECTED_MD5 = _get_md5_hexdigest(TEST_TXT)
+#: An MD5 hexdigest that doesn't match the test file
+MISMATCHING_MD5 = "yolo"
 
 skip_on_windows = unittest.skipIf(
     os.name == "nt",
@@ -55,12 +92,75 @@ class _Session(requests.sessions.Session):
         self.mount("file://", FileAdapter())
 
 
-requests.sessions.Session = _Session
+#: A session shared by the requests made in this module's tests, so file:// URLs can be resolved
+_SESSION = _Session()
+#: A patch that sends requests made with :func:`requests.get` through the shared session
+_REQUEST_PATCH = mock.patch("requests.api.request", new=_SESSION.request)
+
+
+def setUpModule() -> None:
+    """Route requests through the shared session while this module's tests run."""
+    _REQUEST_PATCH.start()
+
+
+def tearDownModule() -> None:
+    """Restore :func:`requests.api.request` and close the shared session."""
+    _REQUEST_PATCH.stop()
+    _SESSION.close()
+
+
+@lru_cache(maxsize=1)
+def _get_test_df() -> pd.DataFrame:
+    """Build the test dataframe on first use, so pandas is only imported by tests that need it."""
+    import pandas as pd
+
+    return pd.DataFrame([[1, 2], [3, 4], [5, 6]], columns=["A", "B"])
+
+
+def _build_tree() -> etree.ElementTree:
+    """Build an XML element tree for testing."""
+    root = etree.Element("Doc")
+    level1 = etree.SubElement(root, "S")
+    main = etree.SubElement(level1, "Text")
+    main.text = "Thanks for contributing an answer to Stack Overflow!"
+    second = etree.SubElement(level1, "Tokens")
+    level2 = etree.SubElement(second, "Token", word="low")
+
+    level3 = etree.SubElement(level2, "Morph")
+    second1 = etree.SubElement(level3, "Lemma")
+    second1.text = "sdfs"
+    second1 = etree.SubElement(level3, "info")
+    second1.text = "qw"
+
+    level4 = etree.SubElement(level3, "Aff")
+    second1 = etree.SubElement(level4, "Type")
+    second1.text = "sdfs"
+    second1 = etree.SubElement(level4, "Suf")
+    second1.text = "qw"
+
+    return etree.ElementTree(root)
 
 
 class TestUtils(unittest.TestCase):
     """Test utility functions."""
 
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Set up fixtures and a temporary directory shared by all tests in the test case."""
+        cls.tree = _build_tree()
+        cls.expected_xml = etree.tostring(cls.tree, pretty_print=True)
+        cls.tmpdir = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        """Tear down the shared temporary directory."""
+        cls.tmpdir.cleanup()
+
+    def setUp(self) -> None:
+        """Set up the test with its own subdirectory of the shared temporary directory."""
+        self.directory = Path(self.tmpdir.name).joinpath(self._testMethodName)
+        self.directory.mkdir()
+
     def test_name_from_url(self):
         """Test :func:`name_from_url`."""
         data = [
@@ -76,26 +176,23 @@ class TestUtils(unittest.TestCase):
     def test_file_values(self):
         """Test encodings."""
         for url, value in [
-            (TEST_TXT, "this is a test file\n"),
-            (TEST_TXT_MD5, "4221d002ceb5d3c9e9137e495ceaa647"),
-            (TEST_TXT_VERBOSE_MD5, "MD5(text.txt)=4221d002ceb5d3c9e9137e495ceaa647"),
-            (TEST_TXT_WRONG_MD5, "yolo"),
+            (TEST_TXT_URI, "this is a test file\n"),
+            (TEST_TXT_MD5_URI, "4221d002ceb5d3c9e9137e495ceaa647"),
+            (TEST_TXT_VERBOSE_MD5_URI, "MD5(text.txt)=4221d002ceb5d3c9e9137e495ceaa647"),
+            (TEST_TXT_WRONG_MD5_URI, "yolo"),
         ]:
-            with self.subTest(name=url.name):
-                self.assertEqual(value, requests.get(url.as_uri(), timeout=15).text)
+            with self.subTest(url=url):
+                self.assertEqual(value, requests.get(url, timeout=15).text)
 
     def test_mkdir(self):
         """Test for ensuring a directory."""
-        with tempfile.TemporaryDirectory() as directory:
-            directory = Path(directory)
-            subdirectory = directory / "sd1"
-            self.assertFalse(subdirectory.exists())
+        subdirectory = self.directory / "sd1"
 
-            mkdir(subdirectory, ensure_exists=False)
-            self.assertFalse(subdirectory.exists())
+        mkdir(subdirectory, ensure_exists=False)
+        self.assertFalse(subdirectory.exists())
 
-            mkdir(subdirectory, ensure_exists=True)
-            self.assertTrue(subdirectory.exists())
+        mkdir(subdirectory, ensure_exists=True)
+        self.assertTrue(subdirectory.exists())
 
     def test_mock_envvar(self):
         """Test that environment variables can be mocked properly."""
@@ -107,26 +204,29 @@ class TestUtils(unittest.TestCase):
             self.assertEqual(value, os.getenv(name))
         self.assertNotIn(name, os.environ)
 
+        # Check that it goes back even if an exception is raised
+        with self.assertRaises(ValueError), mock_envvar(name, value):
+            raise ValueError
+        self.assertNotIn(name, os.environ)
+
     def test_getenv_path(self):
         """Test that :func:`getenv_path` works properly."""
         envvar = n()
 
-        with tempfile.TemporaryDirectory() as directory:
-            directory = Path(directory)
-            value = directory / n()
-            default = directory / n()
+        value = self.directory / n()
+        default = self.directory / n()
 
-            self.assertEqual(default, getenv_path(envvar, default))
-            with mock_envvar(envvar, value.as_posix()):
-                self.assertEqual(value, getenv_path(envvar, default))
-            # Check that it goes back
-            self.assertEqual(default, getenv_path(envvar, default))
+        self.assertEqual(default, getenv_path(envvar, default))
+        with mock_envvar(envvar, value.as_posix()):
+            self.assertEqual(value, getenv_path(envvar, default))
+        # Check that it goes back
+        self.assertEqual(default, getenv_path(envvar, default))
 
     def test_compressed_io(self):
         """Test that the read/write to compressed folder functions work."""
-        rows = [[1, 2], [3, 4], [5, 6]]
-        columns = ["A", "B"]
-        df = pd.DataFrame(rows, columns=columns)
+        import pandas as pd
+
+        df = _get_test_df()
         inner_path = "okay.tsv"
 
         data = [
@@ -134,70 +234,54 @@ class TestUtils(unittest.TestCase):
             ("test.tar.gz", write_tarfile_csv, read_tarfile_csv),
         ]
         for name, writer, reader in data:
-            with self.subTest(name=name), tempfile.TemporaryDirectory() as directory:
-                directory = Path(directory)
-                path = directory / name
-                self.assertFalse(path.exists())
+            with self.subTest(name=name):
+                path = self.directory / name
                 writer(df, path=path, inner_path=inner_path)
                 self.assertTrue(path.exists())
                 new_df = reader(path=path, inner_path=inner_path)
-                self.assertEqual(list(df.columns), list(new_df.columns))
-                self.assertEqual(df.values.tolist(), new_df.values.tolist())
+                pd.testing.assert_frame_equal(df, new_df)
 
     def test_xml_io(self):
         """Test that read/write for XML element tree works."""
-        root = etree.Element("Doc")
-        level1 = etree.SubElement(root, "S")
-        main = etree.SubElement(level1, "Text")
-        main.text = "Thanks for contributing an answer to Stack Overflow!"
-        second = etree.SubElement(level1, "Tokens")
-        level2 = etree.SubElement(second, "Token", word="low")
-
-        level3 = etree.SubElement(level2, "Morph")
-        second1 = etree.SubElement(level3, "Lemma")
-        second1.text = "sdfs"
-        second1 = etree.SubElement(level3, "info")
-        second1.text = "qw"
-
-        level4 = etree.SubElement(level3, "Aff")
-        second1 = etree.SubElement(level4, "Type")
-        second1.text = "sdfs"
-        second1 = etree.SubElement(level4, "Suf")
-        second1.text = "qw"
-
-        tree = etree.ElementTree(root)
         inner_path = "okay.tsv"
         data = [
             ("test.zip", write_zipfile_xml, read_zipfile_xml),
         ]
         for name, writer, reader in data:
-            with self.subTest(name=name), tempfile.TemporaryDirectory() as directory:
-                directory = Path(directory)
-                path = directory / name
+            with self.subTest(name=name):
+                path = self.directory / name
                 self.assertFalse(path.exists())
-                writer(tree, path=path, inner_path=inner_path)
+                writer(self.tree, path=path, inner_path=inner_path)
                 self.assertTrue(path.exists())
                 new_tree = reader(path=path, inner_path=inner_path)
-                self.assertEqual(
-                    etree.tostring(tree, pretty_print=True),
-                    etree.tostring(new_tree, pretty_print=True),
-                )
+                self.assertEqual(self.expected_xml, etree.tostring(new_tree, pretty_print=True))
 
     def test_numpy_io(self):
         """Test IO with numpy."""
+        import numpy as np
+
         arr = np.array([[0, 1], [2, 3]])
         inner_path = "okay.npz"
-        with tempfile.TemporaryDirectory() as directory:
-            directory = Path(directory)
-            path = directory / "test.zip"
-            write_zipfile_np(arr, inner_path=inner_path, path=path)
-            reloaded_arr = read_zip_np(path=path, inner_path=inner_path)
-            self.assertTrue(np.array_equal(arr, reloaded_arr))
+        path = self.directory / "test.zip"
+        write_zipfile_np(arr, inner_path=inner_path, path=path)
+        reloaded_arr = read_zip_np(path=path, inner_path=inner_path)
+        self.assertTrue(np.array_equal(arr, reloaded_arr))
 
 
 class TestDownload(unittest.TestCase):
     """Tests for downloading."""
 
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Set up the class so the bad URL's host fails to resolve without using the network."""
+        cls.getaddrinfo_patch = mock.patch("socket.getaddrinfo", side_effect=socket.gaierror)
+        cls.getaddrinfo_patch.start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        """Tear down the class by restoring host resolution."""
+        cls.getaddrinfo_patch.stop()
+
     def setUp(self) -> None:
         """Set up a test."""
         self.directory_obj = tempfile.TemporaryDirectory()
@@ -219,6 +303,13 @@ class TestDownload(unittest.TestCase):
             )
         self.assertFalse(self.path_for_bad_url.is_file())
 
+    def test_missing_local_file_error(self):
+        """Test that a missing local file is reported like a failed urllib download."""
+        url = self.directory.joinpath("missing.tsv").as_uri()
+        with self.assertRaises(DownloadError):
+            download(url=url, path=self.path_for_bad_url, backend="urllib")
+        self.assertFalse(self.path_for_bad_url.is_file())
+
     def test_requests_error_stream(self):
         """Test that requests errors are handled properly."""
         with self.assertRaises(DownloadError):
@@ -242,45 +333,108 @@ class TestDownload(unittest.TestCase):
         self.assertFalse(self.path_for_bad_url.is_file())
 
 
+class _QuietHandler(SimpleHTTPRequestHandler):
+    """A request handler that serves the test resources without logging each request."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Instantiate the handler to serve files from the test resources directory."""
+        super().__init__(*args, directory=RESOURCES.as_posix(), **kwargs)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Skip logging requests."""
+
+
+class TestDownloadServer(unittest.TestCase):
+    """Tests for downloading over HTTP from a local server."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Set up a local HTTP server for the test resources and a temporary directory."""
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _QuietHandler)
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+        host, port = cls.server.server_address[:2]
+        cls.base_url = f"http://{host}:{port}"
+        cls.tmpdir = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        """Tear down the local HTTP server and the temporary directory."""
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.server_thread.join()
+        cls.tmpdir.cleanup()
+
+    def test_urllib(self):
+        """Test that the urllib backend downloads with its report hook."""
+        path = Path(self.tmpdir.name).joinpath(f"{self._testMethodName}.txt")
+        with mock.patch.object(
+            TqdmReportHook, "update_to", autospec=True, side_effect=TqdmReportHook.update_to
+        ) as update_to:
+            download(
+                url=f"{self.base_url}/{TEST_TXT.name}",
+                path=path,
+                backend="urllib",
+                hexdigests={"md5": EXPECTED_MD5},
+            )
+        self.assertTrue(update_to.called)
+        self.assertEqual(TEST_TXT.read_bytes(), path.read_bytes())
+
+
 class TestHashing(unittest.TestCase):
     """Tests for hexdigest checking."""
 
-    def setUp(self) -> None:
-        """Set up a test."""
-        self.directory = tempfile.TemporaryDirectory()
-        self.path = Path(self.directory.name).joinpath("test.tsv")
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Set up a temporary directory shared by all tests in the test case."""
+        cls.tmpdir = tempfile.TemporaryDirectory()
 
-        md5 = hashlib.md5()  # noqa: S324
-        with TEST_TXT.open("rb") as file:
-            md5.update(file.read())
-        self.expected_md5 = md5.hexdigest()
-        self.mismatching_md5_hexdigest = "yolo"
-        self.assertNotEqual(self.mismatching_md5_hexdigest, self.expected_md5)
+    @classmethod
+    def tearDownClass(cls) -> None:
+        """Tear down the temporary directory shared by all tests in the test case."""
+        cls.tmpdir.cleanup()
 
-    def tearDown(self) -> None:
-        """Tear down a test."""
-        self.directory.cleanup()
-
-    def test_hash_success(self):
-        """Test checking actually works."""
-        self.assertFalse(self.path.exists())
-        download(
-            url=TEST_TXT.as_uri(),
-            path=self.path,
-            hexdigests={
-                "md5": self.expected_md5,
-            },
-        )
+    def setUp(self) -> None:
+        """Set up a test with its own path in the shared temporary directory."""
+        self.path = Path(self.tmpdir.name).joinpath(f"{self._testMethodName}.tsv")
+
+    def test_hash(self):
+        """Test checking hexdigests on download, with and without an existing file."""
+        # an existing file with the wrong content fails the hash check
+        # unless force=True, in which case it's downloaded again
+        for name, expected_hexdigest, existing_content, kwargs, exception in [
+            ("success", EXPECTED_MD5, None, {}, None),
+            ("error", MISMATCHING_MD5, None, {}, HexDigestError),
+            ("override_error", EXPECTED_MD5, "test file content", {"force": False}, HexDigestError),
+            ("force", EXPECTED_MD5, "test file content", {"force": True}, None),
+        ]:
+            with self.subTest(name=name):
+                path = Path(self.tmpdir.name).joinpath(f"{self._testMethodName}_{name}.tsv")
+                if existing_content is not None:
+                    path.write_text(existing_content)
+                    self.assertTrue(path.exists())
+                context = (
+                    contextlib.nullcontext() if exception is None else self.assertRaises(exception)
+                )
+                with context:
+                    download(
+                        url=TEST_TXT_URI,
+                        path=path,
+                        hexdigests={
+                            "md5": expected_hexdigest,
+                        },
+                        **kwargs,
+                    )
 
     @skip_on_windows
     def test_hash_remote_success(self):
         """Test checking actually works."""
         self.assertFalse(self.path.exists())
         download(
-            url=TEST_TXT.as_uri(),
+            url=TEST_TXT_URI,
             path=self.path,
             hexdigests_remote={
-                "md5": TEST_TXT_MD5.as_uri(),
+                "md5": TEST_TXT_MD5_URI,
             },
             hexdigests_strict=True,
         )
@@ -291,10 +445,10 @@ class TestHashing(unittest.TestCase):
         """Test checking actually works."""
         self.assertFalse(self.path.exists())
         download(
-            url=TEST_TXT.as_uri(),
+            url=TEST_TXT_URI,
             path=self.path,
             hexdigests_remote={
-                "md5": TEST_TXT_VERBOSE_MD5.as_uri(),
+                "md5": TEST_TXT_VERBOSE_MD5_URI,
             },
             hexdigests_strict=False,
         )
@@ -305,54 +459,27 @@ class TestHashing(unittest.TestCase):
         self.assertFalse(self.path.exists())
         with self.assertRaises(HexDigestError):
             download(
-                url=TEST_TXT.as_uri(),
+                url=TEST_TXT_URI,
                 path=self.path,
                 hexdigests_remote={
-                    "md5": TEST_TXT_VERBOSE_MD5.as_uri(),
+                    "md5": TEST_TXT_VERBOSE_MD5_URI,
                 },
                 hexdigests_strict=True,
             )
 
-    def test_hash_error(self):
-        """Test hash error on download."""
-        self.assertFalse(self.path.exists())
-        with self.assertRaises(HexDigestError):
-            download(
-                url=TEST_TXT.as_uri(),
-                path=self.path,
-                hexdigests={
-                    "md5": self.mismatching_md5_hexdigest,
-                },
-            )
-
     def test_hash_remote_error(self):
         """Test hash error on download."""
         self.assertFalse(self.path.exists())
         with self.assertRaises(HexDigestError):
             download(
-                url=TEST_TXT.as_uri(),
+                url=TEST_TXT_URI,
                 path=self.path,
                 hexdigests_remote={
-                    "md5": TEST_TXT_WRONG_MD5.as_uri(),
+                    "md5": TEST_TXT_WRONG_MD5_URI,
                 },
                 hexdigests_strict=True,
             )
 
-    def test_override_hash_error(self):
-        """Test hash error on download."""
-        self.path.write_text("test file content")
-
-        self.assertTrue(self.path.exists())
-        with self.assertRaises(HexDigestError):
-            download(
-                url=TEST_TXT.as_uri(),
-                path=self.path,
-                hexdigests={
-                    "md5": self.expected_md5,
-                },
-                force=False,
-            )
-
     def test_override_hash_remote_error(self):
         """Test hash error on download."""
         self.path.write_text("test file content")
@@ -360,30 +487,15 @@ class TestHashing(unittest.TestCase):
         self.assertTrue(self.path.exists())
         with self.assertRaises(HexDigestError):
             download(
-                url=TEST_TXT.as_uri(),
+                url=TEST_TXT_URI,
                 path=self.path,
                 hexdigests_remote={
-                    "md5": TEST_TXT_MD5.as_uri(),
+                    "md5": TEST_TXT_MD5_URI,
                 },
                 hexdigests_strict=True,
                 force=False,
             )
 
-    def test_force(self):
-        """Test overwriting wrong file."""
-        # now if force=True it should not bother with the hash check
-        self.path.write_text("test file content")
-
-        self.assertTrue(self.path.exists())
-        download(
-            url=TEST_TXT.as_uri(),
-            path=self.path,
-            hexdigests={
-                "md5": self.expected_md5,
-            },
-            force=True,
-        )
-
     @skip_on_windows
     def test_remote_force(self):
         """Test overwriting wrong file."""
@@ -392,10 +504,10 @@ class TestHashing(unittest.TestCase):
 
         self.assertTrue(self.path.exists())
         download(
-            url=TEST_TXT.as_uri(),
+            url=TEST_TXT_URI,
             path=self.path,
             hexdigests_remote={
-                "md5": TEST_TXT_MD5.as_uri(),
+                "md5": TEST_TXT_MD5_URI,
             },
             hexdigests_strict=True,
             force=True,
@@ -404,12 +516,12 @@ class TestHashing(unittest.TestCase):
     def test_hexdigest_urls(self):
         """Test getting hex digests from URLs."""
         for url, strict in [
-            (TEST_TXT_MD5, True),
-            (TEST_TXT_MD5, False),
-            (TEST_TXT_VERBOSE_MD5, False),
+            (TEST_TXT_MD5_URI, True),
+            (TEST_TXT_MD5_URI, False),
+            (TEST_TXT_VERBOSE_MD5_URI, False),
         ]:
             hexdigests = get_hexdigests_remote(
-                {"md5": url.as_uri()},
+                {"md5": url},
                 hexdigests_strict=strict,
             )
             self.assertEqual(
@@ -418,7 +530,7 @@ class TestHashing(unittest.TestCase):
             )
 
         hexdigests = get_hexdigests_remote(
-            {"md5": TEST_TXT_VERBOSE_MD5.as_uri()}, hexdigests_strict=True
+            {"md5": TEST_TXT_VERBOSE_MD5_URI}, hexdigests_strict=True
         )
         self.assertNotEqual(
             "4221d002ceb5d3c9e9137e495ceaa647",